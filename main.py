@@ -1,9 +1,58 @@
 import os
 import json
-from typing import List, Dict, Union
+import atexit
+import itertools
+import operator
+import sys
+from collections import OrderedDict
+from typing import List, Dict, Optional, Set, Tuple, Union
 
 import unittest
 
+# orjson заметно быстрее стандартного json, но не обязателен: без него работаем через json.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# readline дает историю ввода и автодополнение, но есть не на всех платформах (например, нет в Windows).
+try:
+    import readline
+except ImportError:
+    readline = None
+
+# Минимальный размер журнала, начиная с которого имеет смысл его сжимать.
+COMPACT_MIN_RECORDS = 100
+# Количество последних запросов поиска, результаты которых хранятся в кэше.
+SEARCH_CACHE_SIZE = 256
+# Файл истории ввода и количество хранимых в нем строк.
+HISTORY_FILE = os.path.expanduser('~/.effmob_history')
+HISTORY_LENGTH = 1000
+
+
+def _dumps(obj) -> bytes:
+    """Сериализует объект в компактный JSON в кодировке UTF-8."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _loads(data: bytes):
+    """Разбирает JSON из байтов в кодировке UTF-8."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _trigrams(text: str) -> Set[str]:
+    """Возвращает множество всех подстрок длины 3 из строки."""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+# Извлекает из словаря поля книги в порядке аргументов Book за один вызов.
+_BOOK_FIELDS = operator.itemgetter('id', 'title', 'author', 'year', 'status')
+
+
 class Book:
     """Класс представляющий книгу.
         Содержит атрибуты:
@@ -13,85 +62,303 @@ class Book:
         4. author - год издания.
         5. status - статус книги в библиотеке, на руках или в наличии.
     """
+    # Атрибуты хранятся в слотах: экземпляр меньше по памяти и быстрее доступ к полям.
+    __slots__ = ('id', 'title', 'author', 'year', '_status', '_title_lc', '_author_lc', '_dict_cache',
+                 '_json_bytes')
+
     def __init__(self, id: int, title: str, author: str, year: int, status: str = "В наличии"):
         self.id = id
         self.title = title
         self.author = author
         self.year = year
-        self.status = status
+        self._status = status
+        # Название и автор в нижнем регистре вычисляются один раз для поиска.
+        self._title_lc = title.lower()
+        self._author_lc = author.lower()
+        # Словарь, возвращаемый to_dict, создается при первом обращении.
+        self._dict_cache: Optional[Dict[str, Union[int, str]]] = None
+        # Готовая строка журнала с записью о книге, создается при первой записи книги в файл.
+        self._json_bytes: Optional[bytes] = None
+
+    @property
+    def status(self) -> str:
+        return self._status
+
+    @status.setter
+    def status(self, status: str):
+        self._status = status
+        # Статус - единственное изменяемое поле, обновим его и в готовом словаре.
+        if self._dict_cache is not None:
+            self._dict_cache["status"] = status
+        self._json_bytes = None
 
     def to_dict(self) -> Dict[str, Union[int, str]]:
-        return {
-            "id": self.id,
-            "title": self.title,
-            "author": self.author,
-            "year": self.year,
-            "status": self.status
-        }
+        if self._dict_cache is None:
+            self._dict_cache = {
+                "id": self.id,
+                "title": self.title,
+                "author": self.author,
+                "year": self.year,
+                "status": self._status
+            }
+        return self._dict_cache
+
+    def _serialized(self) -> bytes:
+        """Возвращает строку журнала с записью о добавлении книги."""
+        if self._json_bytes is None:
+            self._json_bytes = _dumps({'op': 'add', **self.to_dict()}) + b'\n'
+        return self._json_bytes
 
     @staticmethod
     def from_dict(data: Dict[str, Union[int, str]]) -> 'Book':
-        return Book(data['id'], data['title'], data['author'], data['year'], data['status'])
+        return Book(*_BOOK_FIELDS(data))
+
+
+# Получение текстовых полей книги в нижнем регистре для поиска.
+_SEARCH_KEYS = {
+    "title": operator.attrgetter("_title_lc"),
+    "author": operator.attrgetter("_author_lc"),
+}
 
 
 class Library:
     """Класс для управления библиотекой.
      Содержит методы для загрузки, сохранения, добавления,
      удаления, поиска и отображения и смены статуса книг.
+     Изменения дописываются в файл журналом операций (по одной записи JSON в строке),
+     файл целиком перезаписывается только при сжатии журнала.
      """
     def __init__(self, filename: str):
         # Название файла в котором хранится библиотека.
         self.filename = filename
-        # Список книг загружаемый из файла при инициализации экземпляра.
-        self.books: List[Book] = self.load_books()
+        # Открытый на дозапись файл журнала, открывается при первом изменении.
+        self._log = None
+        # Количество записей в журнале, по нему определяем необходимость сжатия.
+        self._log_len = 0
+        # Признак файла, который перед дозаписью нужно переписать журналом целиком:
+        # файл в виде единого массива JSON или журнал с недописанной последней строкой.
+        self._needs_rewrite = False
+        # Список книг, загружается из файла при первом обращении к нему.
+        self._books: Optional[List[Book]] = None
+        # Индекс книг по id для поиска, удаления и смены статуса за O(1).
+        self._by_id: Dict[int, Book] = {}
+        # Позиция каждой книги в списке книг, для удаления без перестроения списка.
+        self._index_by_id: Dict[int, int] = {}
+        # Индекс книг по году издания.
+        self._by_year: Dict[int, List[Book]] = {}
+        # Индексы по триграммам названия и автора в нижнем регистре: триграмма -> id книг.
+        self._title_index: Dict[str, Set[int]] = {}
+        self._author_index: Dict[str, Set[int]] = {}
+        # Кэш результатов поиска свой у каждой библиотеки: (поле, запрос) -> id книг, от старых запросов к новым.
+        # Сбрасывается при добавлении и удалении книг.
+        self._search_cache: OrderedDict[Tuple[str, str], Tuple[int, ...]] = OrderedDict()
+        # Счетчик id для новых книг, всегда больше любого существующего id.
+        self._next_id = 1
+
+    @property
+    def books(self) -> List[Book]:
+        """Список книг библиотеки."""
+        self._ensure_loaded()
+        return self._books
+
+    def _ensure_loaded(self):
+        """Загружает книги из файла и строит индексы, если это еще не сделано."""
+        if self._books is not None:
+            return
+        self._books = self.load_books()
+        for position, book in enumerate(self._books):
+            self._index_by_id[book.id] = position
+            self._index_book(book)
+        self._next_id = max(self._by_id, default=0) + 1
 
     def load_books(self) -> List[Book]:
-        """Загружает книги из файла JSON."""
+        """Загружает книги из файла, воспроизводя журнал операций."""
         # В случае отсутствия файла вернем пустой список.
         if not os.path.exists(self.filename):
             return []
-        # Откроем для чтения файл с библиотекой.
-        with open(self.filename, 'r', encoding='utf-8') as file:
-            book_dicts = json.load(file)
-            # Вернем пользователю список с информацией о книгах.
-            return [Book.from_dict(book_dict) for book_dict in book_dicts]
+        books: Dict[int, Book] = {}
+        # Откроем для чтения файл с библиотекой, журнал читаем построчно, не загружая файл целиком.
+        with open(self.filename, 'rb') as file:
+            lines = (line for line in file if line.strip())
+            first_line = next(lines, b'')
+            # Файл в виде единого массива JSON (стартовый набор или старая версия приложения).
+            if first_line.lstrip().startswith(b'['):
+                self._needs_rewrite = True
+                file.seek(0)
+                return [Book.from_dict(book_dict) for book_dict in _loads(file.read())]
+            # Воспроизведем журнал: каждая строка - добавление, удаление или смена статуса книги.
+            for line in itertools.chain((first_line,) if first_line else (), lines):
+                try:
+                    record = _loads(line)
+                except ValueError:
+                    # Строка повреждена (процесс прерван во время записи, закончилось место на диске):
+                    # восстанавливаем библиотеку по предыдущим записям, журнал перепишем при следующем изменении.
+                    self._needs_rewrite = True
+                    break
+                # После последней строки без перевода строки дописывать нельзя, журнал тоже перепишем.
+                if not line.endswith(b'\n'):
+                    self._needs_rewrite = True
+                op = record.pop('op')
+                if op == 'add':
+                    books[record['id']] = Book.from_dict(record)
+                elif op == 'del':
+                    books.pop(record['id'], None)
+                elif op == 'status':
+                    book = books.get(record['id'])
+                    if book is not None:
+                        book.status = record['status']
+                self._log_len += 1
+        # Вернем пользователю список с информацией о книгах.
+        return list(books.values())
 
     def save_books(self):
-        """Сохраняет книги в файл JSON."""
-        with open(self.filename, 'w', encoding='utf-8') as file:
-            json.dump([book.to_dict() for book in self.books], file, ensure_ascii=False, indent=4)
+        """Сохраняет все книги в файл, заменяя накопленный журнал его сжатой копией."""
+        self.close()
+        # Весь файл собираем в памяти и записываем системными вызовами без буферизации Python.
+        # Строки неизменившихся книг берутся готовыми, сериализуются только новые и измененные.
+        data = b''.join(book._serialized() for book in self.books)
+        # Пишем во временный файл и атомарно подменяем им основной.
+        tmp_filename = self.filename + '.tmp'
+        fd = os.open(tmp_filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+        os.replace(tmp_filename, self.filename)
+        self._log_len = len(self.books)
+        self._needs_rewrite = False
+
+    def compact(self):
+        """Сжимает журнал, если записей в нем стало более чем вдвое больше, чем книг."""
+        if self._log_len > max(2 * len(self.books), COMPACT_MIN_RECORDS):
+            self.save_books()
+
+    def close(self):
+        """Закрывает файл журнала."""
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    def __del__(self):
+        self.close()
+
+    def _append_record(self, line: bytes):
+        """Дописывает в журнал готовую строку с записью об изменении."""
+        # Файл-массив или поврежденный журнал дописывать нельзя, перепишем его сразу журналом с уже внесенным изменением.
+        if self._needs_rewrite:
+            self.save_books()
+            return
+        # Файл открываем один раз, каждую запись сразу передаем ОС, чтобы она не потерялась при закрытии терминала.
+        # fsync не вызываем: надежности записи, которую дает кэш ОС, для библиотеки достаточно.
+        if self._log is None:
+            self._log = open(self.filename, 'ab')
+        self._log.write(line)
+        self._log.flush()
+        self._log_len += 1
+        self.compact()
+
+    def _index_book(self, book: Book):
+        """Добавляет книгу во все индексы."""
+        self._by_id[book.id] = book
+        self._by_year.setdefault(book.year, []).append(book)
+        for gram in _trigrams(book._title_lc):
+            self._title_index.setdefault(gram, set()).add(book.id)
+        for gram in _trigrams(book._author_lc):
+            self._author_index.setdefault(gram, set()).add(book.id)
+
+    def _unindex_book(self, book: Book):
+        """Удаляет книгу из всех индексов."""
+        del self._by_id[book.id]
+        same_year = self._by_year[book.year]
+        same_year.remove(book)
+        if not same_year:
+            del self._by_year[book.year]
+        for index, text in ((self._title_index, book._title_lc), (self._author_index, book._author_lc)):
+            for gram in _trigrams(text):
+                ids = index[gram]
+                ids.discard(book.id)
+                if not ids:
+                    del index[gram]
 
     def add_book(self, title: str, author: str, year: int):
         """Добавляет новую книгу в библиотеку."""
+        self._ensure_loaded()
         # Определим id для новой книги.
-        new_id = self.books[-1].id + 1 if self.books else 1
+        new_id = self._next_id
+        self._next_id += 1
         # Создадим экземпляр класса книги.
         new_book = Book(new_id, title, author, year)
-        # Добавим к списку книг хранящихся в экземпляре класса библиотеки.
+        # Добавим к списку книг хранящихся в экземпляре класса библиотеки и в индекс.
+        self._index_by_id[new_id] = len(self._books)
         self.books.append(new_book)
-        # Сохраним обновленный список в файл.
-        self.save_books()
+        self._index_book(new_book)
+        self._search_cache.clear()
+        # Запишем добавление в журнал.
+        self._append_record(new_book._serialized())
         # Пользователю возвращаем ответ с результатом.
         return f"Книга '{title}' добавлена с ID {new_id}."
 
     def remove_book(self, book_id: int):
         """Удаляет книгу по ID."""
-        # Сохраним количество книг для дальнейшего определения успешности "удаления" книги.
-        before_remove = len(self.books)
-        # Создадим новый список книг в котором не будет удаляемой книги.
-        self.books = [book for book in self.books if book.id != book_id]
-        # Если количество книг изменилось, значит удаление произошло успешно.
-        if len(self.books) < before_remove:
-            self.save_books()
-            return f"Книга с ID {book_id} удалена."
-        else:
+        self._ensure_loaded()
+        # Найдем книгу по индексу, если ее нет - удалять нечего.
+        book = self._by_id.get(book_id)
+        if book is None:
             return "Книга с таким ID не найдена."
+        # Порядок книг не важен: на место удаляемой ставим последнюю книгу списка.
+        position = self._index_by_id.pop(book_id)
+        last = self._books.pop()
+        if last is not book:
+            self._books[position] = last
+            self._index_by_id[last.id] = position
+        self._unindex_book(book)
+        self._search_cache.clear()
+        self._append_record(_dumps({'op': 'del', 'id': book_id}) + b'\n')
+        return f"Книга с ID {book_id} удалена."
 
     def search_books(self, query: str, field: str):
         """Ищет книги по заданному полю."""
-        # Создаем список со всеми совпадениями заданного аттрибута.
-        results = [book for book in self.books if query.lower() in str(getattr(book, field)).lower()]
-        return results
+        self._ensure_loaded()
+        q = query.lower()
+        # Для полей без индекса (например, status) проверяем все книги. Такие результаты не кэшируем:
+        # статус меняется без сброса кэша.
+        if field != "year" and field not in _SEARCH_KEYS:
+            get = operator.attrgetter(field)
+            return [book for book in self.books if q in str(get(book)).lower()]
+        # Повторные запросы, в том числе без результатов, берутся из кэша.
+        key = (field, q)
+        book_ids = self._search_cache.get(key)
+        if book_ids is None:
+            book_ids = self._search_ids(field, q)
+            self._search_cache[key] = book_ids
+            # Вытесняем самый давний запрос.
+            if len(self._search_cache) > SEARCH_CACHE_SIZE:
+                self._search_cache.popitem(last=False)
+        else:
+            self._search_cache.move_to_end(key)
+        return [self._by_id[book_id] for book_id in book_ids]
+
+    def _search_ids(self, field: str, q: str) -> Tuple[int, ...]:
+        """Возвращает id книг, у которых индексируемое поле содержит строку q (в нижнем регистре)."""
+        # Год ищем по подстроке среди различных годов издания, а не среди всех книг.
+        if field == "year":
+            return tuple(sorted(book.id for year, books in self._by_year.items() if q in str(year)
+                                for book in books))
+        index = self._title_index if field == "title" else self._author_index
+        # Функция получения поля в нижнем регистре выбирается один раз, а не для каждой книги.
+        key = _SEARCH_KEYS[field]
+        grams = _trigrams(q)
+        # Для запроса короче трех символов индекс не поможет, проверим все книги.
+        if not grams:
+            return tuple(sorted(book.id for book in self.books if q in key(book)))
+        # Кандидаты - книги, содержащие все триграммы запроса, начинаем с самого короткого списка.
+        postings = sorted((index.get(gram, set()) for gram in grams), key=len)
+        candidates = postings[0].intersection(*postings[1:])
+        # Наличие всех триграмм не гарантирует вхождения подстроки, поэтому проверяем каждого кандидата.
+        by_id = self._by_id
+        return tuple(book_id for book_id in sorted(candidates) if q in key(by_id[book_id]))
 
     def display_books(self):
         """Возвращает все книги из библиотеки."""
@@ -100,14 +367,18 @@ class Library:
 
     def update_status(self, book_id: int, status: str):
         """Обновляет статус книги по ID."""
-        # Переберем простым циклом список с книгами, до совпадения id, после чего сменим статус.
-        for book in self.books:
-            if book.id == book_id:
-                book.status = status
-                # Сохраним обновленный список в файл.
-                self.save_books()
-                return f"Статус книги с ID {book_id} обновлён на '{status}'."
-        return "Книга с таким ID не найдена."
+        self._ensure_loaded()
+        # Найдем книгу по индексу, после чего сменим статус.
+        book = self._by_id.get(book_id)
+        if book is None:
+            return "Книга с таким ID не найдена."
+        # Если статус уже такой, записывать в журнал нечего.
+        if book.status == status:
+            return f"Статус книги с ID {book_id} уже '{status}'."
+        book.status = status
+        # Запишем смену статуса в журнал.
+        self._append_record(_dumps({'op': 'status', 'id': book_id, 'status': status}) + b'\n')
+        return f"Статус книги с ID {book_id} обновлён на '{status}'."
 
 # Тестирование
 # Используется класс TestLibraryMethods,
@@ -123,6 +394,7 @@ class TestLibraryMethods(unittest.TestCase):
 
     # Удаление файла после теста.
     def tearDown(self):
+        self.library.close()
         if os.path.exists(self.test_filename):
             os.remove(self.test_filename)
 
@@ -141,6 +413,14 @@ class TestLibraryMethods(unittest.TestCase):
         self.assertEqual(response, "Книга с ID 1 удалена.")
         self.assertEqual(len(self.library.books), 0)
 
+        # Удаление книги из середины списка не затрагивает остальные книги.
+        for i in range(3, 6):
+            self.library.add_book(f"Тестовая книга {i}", "Автор 2", 2022)
+        self.library.remove_book(3)
+        self.assertEqual(sorted(book.id for book in self.library.books), [2, 4])
+        self.assertEqual(self.library.remove_book(4), "Книга с ID 4 удалена.")
+        self.assertEqual([book.id for book in self.library.books], [2])
+
         # Попробуем удалить книгу с несуществующим ID.
         none_book = self.library.remove_book(999)
         self.assertEqual(none_book, "Книга с таким ID не найдена.")
@@ -153,12 +433,42 @@ class TestLibraryMethods(unittest.TestCase):
         self.assertEqual(len(results), 1)
         self.assertEqual(results[0].title, "Тестовая книга для поиска")
 
+    # Поиск по подстроке в названии, авторе и году.
+    def test_search_books_substring(self):
+        self.library.add_book("Изучаем Python", "Марк Лутц", 2013)
+        self.library.add_book("Чистый Python", "Дэн Бейдер", 2016)
+        self.library.add_book("Изучаем Git", "Анна Скуликари", 2023)
+        self.assertEqual([book.id for book in self.library.search_books("python", "title")], [1, 2])
+        self.assertEqual([book.id for book in self.library.search_books("ст", "title")], [2])
+        self.assertEqual([book.id for book in self.library.search_books("лутц", "author")], [1])
+        self.assertEqual([book.id for book in self.library.search_books("201", "year")], [1, 2])
+        self.assertEqual(self.library.search_books("Ruby", "title"), [])
+        # Поля без индекса ищутся перебором, с учетом текущего статуса.
+        self.library.update_status(2, "Выдана")
+        self.assertEqual([book.id for book in self.library.search_books("выдана", "status")], [2])
+        self.assertEqual([book.id for book in self.library.search_books("3", "id")], [3])
+        # Добавленная книга попадает в результаты ранее выполненного запроса.
+        self.library.add_book("Ruby для начинающих", "Автор 11", 2020)
+        self.assertEqual([book.id for book in self.library.search_books("Ruby", "title")], [4])
+        # Удаленная книга пропадает из результатов поиска.
+        self.library.remove_book(1)
+        self.assertEqual([book.id for book in self.library.search_books("python", "title")], [2])
+
     # Обновление статуса книги.
     def test_update_status(self):
         self.library.add_book("Тестовая книга для смены статуса", "Автор 4", 2023)
         self.assertEqual(self.library.books[0].status, "В наличии")
         self.library.update_status(1, "Выдана")
         self.assertEqual(self.library.books[0].status, "Выдана")
+        # Повторная установка того же статуса не добавляет запись в журнал.
+        self.library.close()
+        with open(self.test_filename, 'rb') as file:
+            lines_before = len(file.readlines())
+        response = self.library.update_status(1, "Выдана")
+        self.assertEqual(response, "Статус книги с ID 1 уже 'Выдана'.")
+        self.library.close()
+        with open(self.test_filename, 'rb') as file:
+            self.assertEqual(len(file.readlines()), lines_before)
 
     # Запись нескольких книг.
     def test_load_books(self):
@@ -175,6 +485,49 @@ class TestLibraryMethods(unittest.TestCase):
         self.assertEqual(len(self.library.books), 2)
         self.assertEqual(self.library.books[0].id, 1)
 
+    # Файл читается при первом обращении к книгам, а не при создании библиотеки.
+    def test_lazy_load(self):
+        library = Library(self.test_filename)
+        with open(self.test_filename, 'w', encoding='utf-8') as file:
+            json.dump([{"id": 1, "title": "Книга 1", "author": "Автор 5", "year": 2020, "status": "В наличии"}],
+                      file, ensure_ascii=False)
+        self.assertEqual(len(library.books), 1)
+
+    # Загрузка библиотеки из журнала изменений.
+    def test_load_journal(self):
+        self.library.add_book("Книга 1", "Автор 8", 2020)
+        self.library.add_book("Книга 2", "Автор 9", 2021)
+        self.library.update_status(2, "Выдана")
+        self.library.remove_book(1)
+        self.library.close()
+
+        # Перезагрузим экземпляр класса библиотеки.
+        self.library = Library(self.test_filename)
+        self.assertEqual(len(self.library.books), 1)
+        self.assertEqual(self.library.books[0].id, 2)
+        self.assertEqual(self.library.books[0].status, "Выдана")
+        # Новые книги получают id больше любого ранее выданного.
+        response = self.library.add_book("Книга 3", "Автор 10", 2022)
+        self.assertEqual(response, "Книга 'Книга 3' добавлена с ID 3.")
+
+    # Загрузка журнала с недописанной последней строкой.
+    def test_load_damaged_journal(self):
+        self.library.add_book("Книга 1", "Автор 8", 2020)
+        self.library.add_book("Книга 2", "Автор 9", 2021)
+        self.library.close()
+        with open(self.test_filename, 'ab') as file:
+            file.write(b'{"op":"status","id":7,"status":"\xd0\x92\xd1\x8b\xd0\xb4\xd0\xb0\xd0\xbd\xd0\xb0"}\n')
+            file.write(b'{"op":"add","id":3,"tit')
+
+        # Библиотека открывается по уцелевшим записям, статус несуществующей книги пропускается.
+        self.library = Library(self.test_filename)
+        self.assertEqual([book.id for book in self.library.books], [1, 2])
+        # После следующего изменения журнал снова читается целиком.
+        self.library.add_book("Книга 3", "Автор 10", 2022)
+        self.library.close()
+        self.library = Library(self.test_filename)
+        self.assertEqual([book.id for book in self.library.books], [1, 2, 3])
+
     # Получение списка книг.
     def test_display_books(self):
         self.library.add_book("Тестовая книга 3", "Автор 7", 2021)
@@ -196,113 +549,177 @@ def create_start_books(filename):
         print("Стартовый набор книг добавлен в библиотеку.")
 
 
+# Текст меню выводится одной записью в stdout вместо отдельного print на каждую строку.
+MENU = (
+    "\nУправление библиотекой.\n"
+    "1. Добавить книгу.\n"
+    "2. Удалить книгу.\n"
+    "3. Искать книгу.\n"
+    "4. Показать все книги.\n"
+    "5. Изменить статус книги.\n"
+    "6. Выполнить тестирование на unittest.\n"
+)
+
+
+# Поле для поиска по номеру или названию, отсутствие ключа означает некорректный ввод.
+FIELD_MAP = {
+    "1": "title",
+    "2": "author",
+    "3": "year",
+    "title": "title",
+    "author": "author",
+    "year": "year",
+}
+
+# Статус книги по введенному номеру.
+STATUS_MAP = {
+    "1": "В наличии",
+    "0": "Выдана",
+}
+
+
+def write_books(books: List[Book]):
+    """Выводит информацию о книгах, по строке на книгу, одной записью в stdout."""
+    sys.stdout.write("".join(f"{book.to_dict()}\n" for book in books))
+
+
+# 1. Добавление книги:
+# Пользователь вводит title, author и year,
+# после чего книга добавляется в библиотеку с уникальным id и статусом “в наличии”.
+# Добавлена простая обработка пустого ввода для каждого пункта, в этом случае идет возврат в меню.
+def _do_add(library: Library):
+    title = input("Введите название: ")
+    if title == "":
+        input("\nВведено некорректное название книги(пустая строка), попробуйте снова. Нажмите enter для продолжения.")
+        return
+    author = input("Введите автора: ")
+    if author == "":
+        input("\nВведен некорректный автор книги(пустая строка), попробуйте снова. Нажмите enter для продолжения.")
+        return
+    year = input("Введите год издания: ")
+    if year == "":
+        input("\nВведен некорректный год издания книги(пустая строка), попробуйте снова. Нажмите enter для продолжения.")
+        return
+    try:
+        year = int(year)
+    except ValueError:
+        input("\nВведен некорректный год издания книги, попробуйте снова. Нажмите enter для продолжения.")
+    else:
+        answer = library.add_book(title, author, year)
+        input(f"\n{answer} Нажмите enter для продолжения.")
+
+
+# 2. Удаление книги:
+# Пользователь вводит id книги, которую нужно удалить.
+def _do_remove(library: Library):
+    book_id = int(input("Введите ID книги для удаления: "))
+    # Метод класса возвращает ответ, который мы выводим пользователю.
+    answer = library.remove_book(book_id)
+    input(f"\n{answer} Нажмите enter для продолжения.")
+
+
+# 3. Поиск книги:
+# Пользователь может искать книги по title, author или year.
+def _do_search(library: Library):
+    field = FIELD_MAP.get(input("Искать по title(1), author(2) или year(3). Укажите текстом или цифрой: ").strip().lower())
+    if field is None:
+        input(f"\nПараметр для поиска указан не верно, попробуйте снова. Нажмите enter для продолжения.")
+    else:
+        query = input("Введите значение выбранного параметра для поиска: ")
+        if query == "":
+            input(f"\nВведено пустое поле, попробуйте снова. Нажмите enter для продолжения.")
+        else:
+            # Метод класса возвращает ответ, который мы выводим пользователю.
+            answer = library.search_books(query, field)
+            if answer:
+                write_books(answer)
+                input(f"\nНажмите enter для продолжения.")
+            else:
+                input(f"\nКниги не найдены. Нажмите enter для продолжения.")
+
+
+# 4. Отображение всех книг:
+# Приложение выводит список всех книг с их id, title, author, year и status.
+def _do_display(library: Library):
+    # Метод класса возвращает ответ, который мы выводим пользователю.
+    answer = library.display_books()
+    if answer:
+        write_books(answer)
+        input(f"\nНажмите enter для продолжения.")
+    else:
+        input(f"\nКниги не найдены. Нажмите enter для продолжения.")
+
+
+# 5. Изменение статуса книги:
+# Пользователь вводит id книги и новый статус (“в наличии” или “выдана”).
+def _do_update(library: Library):
+    book_id = int(input("Введите ID книги для изменения статуса: "))
+    status = STATUS_MAP.get(input("Введите новый статус ('В наличии(1)' или 'Выдана(0)'): ").strip())
+    if status is None:
+        input("Введен некорректный статус, попробуйте снова. Нажмите enter для продолжения.")
+    else:
+        # Метод класса возвращает ответ, который мы выводим пользователю.
+        answer = library.update_status(book_id, status)
+        input(f"\n{answer} Нажмите enter для продолжения.")
+
+
+# 6. Запуск тестирования.
+def _do_tests(library: Library):
+    unittest.main()
+
+
+# Обработчики пунктов меню по введенному номеру.
+HANDLERS = {
+    '1': _do_add,
+    '2': _do_remove,
+    '3': _do_search,
+    '4': _do_display,
+    '5': _do_update,
+    '6': _do_tests,
+}
+
+
+def setup_readline():
+    """Включает историю ввода между запусками и автодополнение по Tab."""
+    if readline is None:
+        return
+    try:
+        readline.read_history_file(HISTORY_FILE)
+    except OSError:
+        pass
+    readline.set_history_length(HISTORY_LENGTH)
+    atexit.register(readline.write_history_file, HISTORY_FILE)
+
+    # Варианты дополнения: названия полей для поиска и ранее введенные строки, сначала самые свежие.
+    matches: List[str] = []
+
+    def complete(text: str, state: int) -> Optional[str]:
+        if state == 0:
+            history = (readline.get_history_item(i) for i in range(readline.get_current_history_length(), 0, -1))
+            candidates = dict.fromkeys(itertools.chain(("title", "author", "year"), history))
+            matches[:] = [candidate for candidate in candidates if candidate and candidate.startswith(text)]
+        return matches[state] if state < len(matches) else None
+
+    # Дополняем строку целиком, чтобы подставлять запросы из нескольких слов.
+    readline.set_completer_delims('')
+    readline.set_completer(complete)
+    readline.parse_and_bind('tab: complete')
+
+
 def main():
     # При первом запуске(отсутствующий файл) внесем стартовый набор книг.
     if not os.path.exists('books.json'):
         create_start_books('books.json')
+    setup_readline()
     # Создадим экземпляр библиотеки загрузив данные из файла.
     library = Library('books.json')
     # Запустим бесконечный цикл с меню.
     while True:
-        print("\nУправление библиотекой.")
-        print("1. Добавить книгу.")
-        print("2. Удалить книгу.")
-        print("3. Искать книгу.")
-        print("4. Показать все книги.")
-        print("5. Изменить статус книги.")
-        print("6. Выполнить тестирование на unittest.")
+        sys.stdout.write(MENU)
         choice = input("Выберите опцию: ")
-
-        # 1. Добавление книги:
-        # Пользователь вводит title, author и year,
-        # после чего книга добавляется в библиотеку с уникальным id и статусом “в наличии”.
-        # Добавлена простая обработка пустого ввода для каждого пункта, в этом случае идет возврат в меню.
-        if choice == '1':
-            title = input("Введите название: ")
-            if title == "":
-                input("\nВведено некорректное название книги(пустая строка), попробуйте снова. Нажмите enter для продолжения.")
-                continue
-            author = input("Введите автора: ")
-            if author == "":
-                input("\nВведен некорректный автор книги(пустая строка), попробуйте снова. Нажмите enter для продолжения.")
-                continue
-            year = input("Введите год издания: ")
-            if year == "":
-                input("\nВведен некорректный год издания книги(пустая строка), попробуйте снова. Нажмите enter для продолжения.")
-                continue
-            try:
-                year = int(year)
-            except ValueError:
-                input("\nВведен некорректный год издания книги, попробуйте снова. Нажмите enter для продолжения.")
-            else:
-                answer = library.add_book(title, author, year)
-                input(f"\n{answer} Нажмите enter для продолжения.")
-
-        # 2. Удаление книги:
-        # Пользователь вводит id книги, которую нужно удалить.
-        elif choice == '2':
-            book_id = int(input("Введите ID книги для удаления: "))
-            # Метод класса возвращает ответ, который мы выводим пользователю.
-            answer = library.remove_book(book_id)
-            input(f"\n{answer} Нажмите enter для продолжения.")
-
-        # 3. Поиск книги:
-        # Пользователь может искать книги по title, author или year.
-        elif choice == '3':
-            field = input("Искать по title(1), author(2) или year(3). Укажите текстом или цифрой: ")
-            if field == "1": field = "title"
-            elif field == "2": field = "author"
-            elif field == "3": field = "year"
-            if field != "title" and field != "author" and field != "year":
-                input(f"\nПараметр для поиска указан не верно, попробуйте снова. Нажмите enter для продолжения.")
-            else:
-                query = input("Введите значение выбранного параметра для поиска: ")
-                if query == "":
-                    input(f"\nВведено пустое поле, попробуйте снова. Нажмите enter для продолжения.")
-                else:
-                    # Метод класса возвращает ответ, который мы выводим пользователю.
-                    answer = library.search_books(query, field)
-                    if answer:
-                        for book in answer:
-                            print(book.to_dict())
-                        input(f"\nНажмите enter для продолжения.")
-                    else:
-                        input(f"\nКниги не найдены. Нажмите enter для продолжения.")
-
-        # 4. Отображение всех книг:
-        # Приложение выводит список всех книг с их id, title, author, year и status.
-        elif choice == '4':
-            # Метод класса возвращает ответ, который мы выводим пользователю.
-            answer = library.display_books()
-            if answer:
-                for book in answer:
-                    print(book.to_dict())
-                input(f"\nНажмите enter для продолжения.")
-            else:
-                input(f"\nКниги не найдены. Нажмите enter для продолжения.")
-
-        # 5. Изменение статуса книги:
-        # Пользователь вводит id книги и новый статус (“в наличии” или “выдана”).
-        elif choice == '5':
-            book_id = int(input("Введите ID книги для изменения статуса: "))
-            status = input("Введите новый статус ('В наличии(1)' или 'Выдана(0)'): ")
-            if status == "1":
-                status = 'В наличии'
-                # Метод класса возвращает ответ, который мы выводим пользователю.
-                answer = library.update_status(book_id, status)
-                input(f"\n{answer} Нажмите enter для продолжения.")
-            elif status == "0":
-                status = 'Выдана'
-                # Метод класса возвращает ответ, который мы выводим пользователю.
-                answer = library.update_status(book_id, status)
-                input(f"\n{answer} Нажмите enter для продолжения.")
-            else:
-                input("Введен некорректный статус, попробуйте снова. Нажмите enter для продолжения.")
-
-        # 6. Запуск тестирования.
-        elif choice == '6':
-            unittest.main()
-
+        handler = HANDLERS.get(choice)
+        if handler is not None:
+            handler(library)
         else:
             input("Неверный выбор, попробуйте снова. Нажмите enter для продолжения.")
 